@@ -4,11 +4,37 @@ from datetime import timedelta
 import subprocess
 import os
 import time
+import threading
 import requests
-import base64
 import argparse
 import paramiko
 from pathlib import Path
+from five9_profiling import ReportProfiler, NULL_PROFILER, print_profile
+from five9_soap_codec import (
+    FIVE9_ADMIN_URL,
+    request_headers,
+    encode_run_report,
+    encode_is_report_running,
+    encode_get_report_result_csv,
+    encode_get_report_result,
+    decode_return
+)
+from five9_report_records import ReportResultParser, RECORD_WRITERS, parse_column_types
+
+# One requests.Session per thread, so repeated SOAP calls reuse a warm
+# keep-alive connection; sessions are not documented as thread-safe and the
+# gateway runs reports from several threads at once
+_thread_state = threading.local()
+
+def get_http_session():
+    session = getattr(_thread_state, 'session', None)
+    if session is None:
+        session = _thread_state.session = requests.Session()
+    return session
+
+# (connect, read) seconds for every SOAP call, so a stalled connection fails
+# instead of hanging the caller
+HTTP_TIMEOUT = (10, 120)
 
 def get_date_ranges():
     today = datetime.datetime.now()
@@ -35,7 +61,7 @@ def create_output_directory():
     os.makedirs(output_dir, exist_ok=True)
     return output_dir
 
-def get_clean_filename(report_name):
+def get_clean_filename(report_name, extension='csv'):
     # Start with the report name
     clean_name = report_name.lower()  # Convert to lowercase
     
@@ -59,7 +85,7 @@ def get_clean_filename(report_name):
     
     # Add timestamp
     timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    return f"{clean_name}_{timestamp}.csv"
+    return f"{clean_name}_{timestamp}.{extension}"
 
 def sanitize_report_name(name):
     """
@@ -81,100 +107,74 @@ def run_report(credentials, folder, report_name, start_time, end_time):
     # Sanitize the report name before using it in the API call
     report_name = sanitize_report_name(report_name)
     
-    soap_request = f'''
-    <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ser="http://service.admin.ws.five9.com/">
-       <soapenv:Header/>
-       <soapenv:Body>
-          <ser:runReport>
-             <folderName>{folder}</folderName>
-             <reportName>{report_name}</reportName>
-             <criteria>
-                <time>
-                   <start>{start_time}</start>
-                   <end>{end_time}</end>
-                </time>
-             </criteria>
-          </ser:runReport>
-       </soapenv:Body>
-    </soapenv:Envelope>
-    '''
-    
-    response = requests.post(
-        "https://api.five9.com/wsadmin/v13/AdminWebService",
-        headers={
-            'Content-Type': 'text/xml',
-            'Authorization': f'Basic {base64.b64encode(credentials.encode()).decode()}'
-        },
-        data=soap_request
+    response = get_http_session().post(
+        FIVE9_ADMIN_URL,
+        headers=request_headers(credentials),
+        data=encode_run_report(folder, report_name, start_time, end_time),
+        timeout=HTTP_TIMEOUT
     )
     
-    if response.status_code != 200:
-        raise Exception(f"Failed to run report: {response.text}")
-        
     # Extract identifier from response
-    import xml.etree.ElementTree as ET
-    root = ET.fromstring(response.text)
-    return root.find('.//return').text
+    return decode_return(response.status_code, response.content, 'run report')
 
 def check_report_status(credentials, identifier):
-    soap_request = f'''
-    <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ser="http://service.admin.ws.five9.com/">
-       <soapenv:Header/>
-       <soapenv:Body>
-          <ser:isReportRunning>
-             <identifier>{identifier}</identifier>
-          </ser:isReportRunning>
-       </soapenv:Body>
-    </soapenv:Envelope>
-    '''
-    
-    response = requests.post(
-        "https://api.five9.com/wsadmin/v13/AdminWebService",
-        headers={
-            'Content-Type': 'text/xml',
-            'Authorization': f'Basic {base64.b64encode(credentials.encode()).decode()}'
-        },
-        data=soap_request
+    response = get_http_session().post(
+        FIVE9_ADMIN_URL,
+        headers=request_headers(credentials),
+        data=encode_is_report_running(identifier),
+        timeout=HTTP_TIMEOUT
     )
     
-    if response.status_code != 200:
-        raise Exception(f"Failed to check report status: {response.text}")
-        
     # Parse response to determine if report is still running
-    import xml.etree.ElementTree as ET
-    root = ET.fromstring(response.text)
-    return root.find('.//return').text.lower() == 'true'
+    return decode_return(response.status_code, response.content, 'check report status').lower() == 'true'
 
-def get_report_results(credentials, identifier):
-    soap_request = f'''
-    <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ser="http://service.admin.ws.five9.com/">
-       <soapenv:Header/>
-       <soapenv:Body>
-          <ser:getReportResultCsv>
-             <identifier>{identifier}</identifier>
-          </ser:getReportResultCsv>
-       </soapenv:Body>
-    </soapenv:Envelope>
-    '''
-    
-    response = requests.post(
-        "https://api.five9.com/wsadmin/v13/AdminWebService",
-        headers={
-            'Content-Type': 'text/xml',
-            'Authorization': f'Basic {base64.b64encode(credentials.encode()).decode()}'
-        },
-        data=soap_request
-    )
-    
-    if response.status_code != 200:
-        raise Exception(f"Failed to get report results: {response.text}")
+def get_report_results(credentials, identifier, profiler=NULL_PROFILER):
+    with profiler.phase('fetch'):
+        response = get_http_session().post(
+            FIVE9_ADMIN_URL,
+            headers=request_headers(credentials),
+            data=encode_get_report_result_csv(identifier),
+            timeout=HTTP_TIMEOUT
+        )
+        
+    # Extract CSV data from response, straight from the raw bytes
+    with profiler.phase('extract'):
+        return decode_return(response.status_code, response.content, 'get report results')
+
+def get_report_records(credentials, identifier, writer, records_config, profiler=NULL_PROFILER):
+    """
+    Fetch results through the structured getReportResult call and pass
+    typed record batches to writer as the response streams in
+    """
+    with profiler.phase('fetch'):
+        response = get_http_session().post(
+            FIVE9_ADMIN_URL,
+            headers=request_headers(credentials),
+            data=encode_get_report_result(identifier),
+            timeout=HTTP_TIMEOUT,
+            stream=True
+        )
+        
+    # Always release the streamed connection, even if parsing fails part way
+    try:
+        if response.status_code != 200:
+            decode_return(response.status_code, response.content, 'get report records')
         
-    # Extract CSV data from response
-    import xml.etree.ElementTree as ET
-    root = ET.fromstring(response.text)
-    return root.find('.//return').text
+        parser = ReportResultParser(records_config['batch_size'], records_config['column_types'])
+        with profiler.phase('records'):
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                for batch in parser.feed(chunk):
+                    writer.write_batch(batch)
+            for batch in parser.close():
+                writer.write_batch(batch)
+    finally:
+        response.close()
+    
+    if parser.header is None:
+        raise Exception("Failed to get report records: response has no report header")
+    return parser.row_count
 
-def run_single_report(report, output_dir, credentials):
+def run_single_report(report, output_dir, credentials, profiler=NULL_PROFILER, records_config=None):
     try:
         print(f"  Name: {report['name']}")
         print(f"  Folder: {report['folder']}")
@@ -184,35 +184,55 @@ def run_single_report(report, output_dir, credentials):
         
         
         print("  Calling run_report API...")
-        identifier = run_report(
-            credentials,
-            report['folder'],
-            report['name'], 
-            report['start'],
-            report['end']
-        )
+        with profiler.phase('run_report'):
+            identifier = run_report(
+                credentials,
+                report['folder'],
+                report['name'], 
+                report['start'],
+                report['end']
+            )
         print(f"  Got report identifier: {identifier}")
         
         
         print("  Checking report status...")
         start_time = time.time()
         timeout = 300  
-        while check_report_status(credentials, identifier):
-            elapsed = time.time() - start_time
-            if elapsed > timeout:
-                raise Exception(f"Report timed out after {timeout} seconds")
-            print(f"  Still running... ({elapsed:.0f} seconds elapsed)")
-            time.sleep(5)
+        with profiler.phase('poll'):
+            while check_report_status(credentials, identifier):
+                elapsed = time.time() - start_time
+                if elapsed > timeout:
+                    raise Exception(f"Report timed out after {timeout} seconds")
+                print(f"  Still running... ({elapsed:.0f} seconds elapsed)")
+                time.sleep(5)
             
-        print("  Report completed, fetching results...")
-        # Get results
-        results = get_report_results(credentials, identifier)
-        
-        # Save to file
-        clean_name = get_clean_filename(report['name'])
-        filepath = os.path.join(output_dir, clean_name)
-        with open(filepath, 'w') as f:
-            f.write(results)
+        if records_config:
+            print("  Report completed, fetching records...")
+            writer_class = RECORD_WRITERS[records_config['format']]
+            clean_name = get_clean_filename(report['name'], writer_class.extension)
+            filepath = os.path.join(output_dir, clean_name)
+            # Write to a temporary name so a failed fetch leaves no partial file
+            partial_path = f"{filepath}.part"
+            try:
+                with open(partial_path, 'w', newline='') as f:
+                    row_count = get_report_records(credentials, identifier, writer_class(f), records_config, profiler)
+                os.replace(partial_path, filepath)
+            except Exception:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
+            print(f"  Wrote {row_count} records")
+        else:
+            print("  Report completed, fetching results...")
+            # Get results
+            results = get_report_results(credentials, identifier, profiler)
+            
+            # Save to file
+            clean_name = get_clean_filename(report['name'])
+            filepath = os.path.join(output_dir, clean_name)
+            with profiler.phase('write'):
+                with open(filepath, 'w') as f:
+                    f.write(results)
             
         print(f"  ✓ Success - Saved to {filepath}")
         return True, filepath  
@@ -221,8 +241,12 @@ def run_single_report(report, output_dir, credentials):
         print(f"  ✗ Error - {str(e)}")
         return False, str(e)  # Return tuple of failure status and error message
 
-def upload_to_sftp(local_file, sftp_config):
+def upload_to_sftp(local_file, sftp_config, profiler=NULL_PROFILER):
     """Upload a file to an SFTP server"""
+    with profiler.phase('upload'):
+        return _upload_to_sftp(local_file, sftp_config)
+
+def _upload_to_sftp(local_file, sftp_config):
     try:
         print(f"\nUploading {local_file} to SFTP server {sftp_config['host']}...")
         transport = paramiko.Transport((sftp_config['host'], sftp_config['port']))
@@ -249,7 +273,7 @@ def upload_to_sftp(local_file, sftp_config):
         print(f"✗ SFTP upload failed: {str(e)}")
         return False
 
-def run_reports(credentials, sftp_config=None):
+def run_reports(credentials, sftp_config=None, profile=False, cprofile=False, records_config=None):
     start_time = datetime.datetime.now()
     dates = get_date_ranges()
     output_dir = create_output_directory()
@@ -269,6 +293,8 @@ def run_reports(credentials, sftp_config=None):
     print(f"Started at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Output directory: {output_dir}")
     print(f"Total reports to run: {len(reports)}")
+    if records_config:
+        print(f"Fetch mode: records ({records_config['format']})")
     print("\n=== Date Ranges ===")
     print(f"Date Range: {dates['last_week_start']} to {dates['last_week_end']}")
     print("\n=== Starting Report Execution ===")
@@ -280,7 +306,9 @@ def run_reports(credentials, sftp_config=None):
     # Run each report
     for index, report in enumerate(reports, 1):
         print(f"\n[{index}/{len(reports)}] Processing Report:")
-        success, result = run_single_report(report, output_dir, credentials)
+        profiler = ReportProfiler(report['name'], use_cprofile=cprofile) if profile else NULL_PROFILER
+        profiler.start()
+        success, result = run_single_report(report, output_dir, credentials, profiler, records_config)
         
         if success:
             successful_reports += 1
@@ -293,7 +321,7 @@ def run_reports(credentials, sftp_config=None):
             
             # Upload to SFTP if configured
             if sftp_config:
-                upload_to_sftp(result, sftp_config)
+                upload_to_sftp(result, sftp_config, profiler)
         else:
             failed_reports += 1
             report_results.append({
@@ -302,6 +330,10 @@ def run_reports(credentials, sftp_config=None):
                 'error': result
             })
         
+        profile_record = profiler.finish(output_dir)
+        if profile_record:
+            report_results[-1]['profile'] = profile_record
+        
         print(f"\n  Progress: {index}/{len(reports)} reports processed")
         print(f"  Running totals: {successful_reports} successful, {failed_reports} failed")
     
@@ -326,6 +358,8 @@ def run_reports(credentials, sftp_config=None):
             print(f"Output: {result['file']}")
         else:
             print(f"Error: {result['error']}")
+        if 'profile' in result:
+            print_profile(result['profile'])
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Five9 Call Log Report Runner')
@@ -335,6 +369,12 @@ if __name__ == "__main__":
     parser.add_argument('--sftp-username', help='SFTP username')
     parser.add_argument('--sftp-password', help='SFTP password')
     parser.add_argument('--sftp-path', default='/', help='SFTP remote path (default: /)')
+    parser.add_argument('--profile', action='store_true', help='Record peak memory and top allocation sites for each report phase')
+    parser.add_argument('--profile-cprofile', action='store_true', help='With --profile, also save a cProfile .prof file per report')
+    parser.add_argument('--records', action='store_true', help='Fetch typed records with getReportResult instead of the CSV blob')
+    parser.add_argument('--records-format', choices=sorted(RECORD_WRITERS), default='csv', help='Output format for --records (default: csv)')
+    parser.add_argument('--records-batch-size', type=int, default=5000, help='Rows per record batch for --records (default: 5000)')
+    parser.add_argument('--column-type', action='append', metavar='NAME=TYPE', help='With --records, convert a column to int, float or str (repeatable)')
     
     args = parser.parse_args()
     
@@ -348,4 +388,16 @@ if __name__ == "__main__":
             'path': args.sftp_path
         }
     
-    run_reports(args.credentials, sftp_config)
+    records_config = None
+    if args.records:
+        try:
+            column_types = parse_column_types(args.column_type)
+        except ValueError as e:
+            parser.error(str(e))
+        records_config = {
+            'format': args.records_format,
+            'batch_size': args.records_batch_size,
+            'column_types': column_types
+        }
+    
+    run_reports(args.credentials, sftp_config, args.profile, args.profile_cprofile, records_config)
@@ -0,0 +1,329 @@
+import os
+import sys
+import csv
+import json
+import time
+import datetime
+import argparse
+from datetime import timedelta
+from collections import OrderedDict
+from five9_reports_api_envvar import (
+    get_credentials_from_env,
+    get_sftp_config_from_env,
+    run_report,
+    check_report_status,
+    get_report_records,
+    upload_to_sftp
+)
+from five9_report_records import RecordBatch, RECORD_WRITERS, parse_column_types
+
+def format_five9_time(moment):
+    """
+    Format a timezone-aware datetime for Five9 with its real UTC offset.
+    The runners' fixed -05:00 suffix is fine for whole days but shifts a
+    short window hours away from now on any host not on EST.
+    """
+    text = moment.strftime("%Y-%m-%dT%H:%M:%S.000%z")
+    return f"{text[:-2]}:{text[-2:]}"
+
+def get_tail_range(window_seconds, now=None):
+    """Return (start, end) for a window ending now, in Five9's expected format"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    if now.tzinfo is None:
+        raise ValueError("get_tail_range needs a timezone-aware time")
+
+    # Five9 times carry no fractions, so round the end up to keep now inside
+    end = now.replace(microsecond=0) + timedelta(seconds=1)
+    start = end - timedelta(seconds=window_seconds)
+    start_text, end_text = format_five9_time(start), format_five9_time(end)
+
+    if not (datetime.datetime.fromisoformat(start_text) <= now <= datetime.datetime.fromisoformat(end_text)):
+        raise Exception(f"Tail window {start_text} to {end_text} does not contain the current time {now.isoformat()}")
+    return start_text, end_text
+
+def _row_key(values):
+    # Keys are compared as text so rows read back from the output file match
+    # rows typed by --column-type
+    return tuple('' if value is None else str(value) for value in values)
+
+class RecentKeyIndex:
+    """Bounded set of recently seen row keys; the oldest keys are dropped first"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def add(self, key):
+        """Remember key and return True if it had not been seen"""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+        return True
+
+class TailWriter:
+    """
+    Record writer that drops rows already in the index and appends the rest
+    to a rolling output file, one file per day. With an upload_dir, each
+    poll's new rows are also written to a small file of their own there so
+    only those rows need to be uploaded.
+    """
+
+    def __init__(self, output_dir, report_name, output_format, key_columns, index, upload_dir=None):
+        self.output_dir = output_dir
+        self.base_name = ''.join(c if c.isalnum() else '_' for c in report_name.lower())
+        self.writer_class = RECORD_WRITERS[output_format]
+        self.key_columns = key_columns
+        self.index = index
+        self.upload_dir = upload_dir
+        self.path = None
+        self.poll_path = None
+        self.new_rows = 0
+        self._date = None
+        self._file = None
+        self._writer = None
+        self._poll_file = None
+        self._poll_writer = None
+
+    def start_poll(self):
+        self.new_rows = 0
+        self.poll_path = None
+
+    def finish_poll(self):
+        """Close this poll's upload file and return its path, or None when there were no new rows"""
+        if self._poll_file:
+            self._poll_file.close()
+            self._poll_file = None
+            self._poll_writer = None
+        return self.poll_path
+
+    def write_batch(self, batch):
+        key_values = [batch.columns[i] for i in self._key_indexes(batch.header)]
+        keys = [_row_key(key) for key in zip(*key_values)]
+        keep = []
+        batch_keys = set()
+        for i, key in enumerate(keys):
+            if key not in self.index and key not in batch_keys:
+                batch_keys.add(key)
+                keep.append(i)
+
+        if keep:
+            if len(keep) < len(batch):
+                batch = RecordBatch(batch.header, [[column[i] for i in keep] for column in batch.columns])
+            self._writer_for_today().write_batch(batch)
+            if self.upload_dir:
+                self._writer_for_poll().write_batch(batch)
+            self.new_rows += len(keep)
+
+        # Keys are only remembered once their rows are written, so a failed
+        # write leaves them to be picked up by the next poll
+        for key in keys:
+            self.index.add(key)
+
+    def _key_indexes(self, header):
+        missing = [name for name in self.key_columns if name not in header]
+        if missing:
+            raise Exception(f"Key column(s) {', '.join(missing)} not in report columns: {', '.join(header)}")
+        return [header.index(name) for name in self.key_columns]
+
+    def _writer_for_today(self):
+        date = datetime.datetime.now().strftime('%Y%m%d')
+        if date != self._date:
+            self.close()
+            self._date = date
+            self.path = os.path.join(self.output_dir, f"{self.base_name}_{date}.{self.writer_class.extension}")
+            existing = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+            self._file = open(self.path, 'a', newline='')
+            self._writer = self.writer_class(self._file, write_header=not existing)
+        return self._writer
+
+    def _writer_for_poll(self):
+        if self._poll_writer is None:
+            stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+            self.poll_path = os.path.join(self.upload_dir, f"{self.base_name}_{stamp}.{self.writer_class.extension}")
+            self._poll_file = open(self.poll_path, 'w', newline='')
+            self._poll_writer = self.writer_class(self._poll_file)
+        return self._poll_writer
+
+    def seed_from_output(self):
+        """Load keys from today's output file so a restart does not repeat rows"""
+        date = datetime.datetime.now().strftime('%Y%m%d')
+        path = os.path.join(self.output_dir, f"{self.base_name}_{date}.{self.writer_class.extension}")
+        if not os.path.exists(path):
+            return 0
+
+        seeded = 0
+        with open(path, newline='') as f:
+            if self.writer_class.extension == 'csv':
+                rows = csv.reader(f)
+                header = next(rows, None)
+                if header is None:
+                    return 0
+                indexes = self._key_indexes(header)
+                keys = (_row_key(row[i] if i < len(row) else None for i in indexes) for row in rows)
+            else:
+                records = (json.loads(line) for line in f if line.strip())
+                keys = (_row_key(record.get(name) for name in self.key_columns) for record in records)
+            for key in keys:
+                seeded += self.index.add(key)
+        return seeded
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._writer = None
+        self.finish_poll()
+
+def poll_once(credentials, writer, records_config, folder, report_name, window, timeout=300):
+    """Run the report for the current window and append its new rows; returns (rows, new rows, start, end)"""
+    start, end = get_tail_range(window)
+    identifier = run_report(credentials, folder, report_name, start, end)
+
+    started = time.time()
+    while check_report_status(credentials, identifier):
+        if time.time() - started > timeout:
+            raise Exception(f"Report timed out after {timeout} seconds")
+        time.sleep(1)
+
+    writer.start_poll()
+    try:
+        row_count = get_report_records(credentials, identifier, writer, records_config)
+    finally:
+        writer.flush()
+        writer.finish_poll()
+    return row_count, writer.new_rows, start, end
+
+def upload_pending(upload_dir, sftp_config):
+    """
+    Upload the per-poll files oldest first, deleting each once it is on the
+    server; a failed upload is left in place and retried after the next poll
+    """
+    uploaded = 0
+    for name in sorted(os.listdir(upload_dir)):
+        path = os.path.join(upload_dir, name)
+        if not upload_to_sftp(path, sftp_config):
+            break
+        os.remove(path)
+        uploaded += 1
+    return uploaded
+
+def run_tail(credentials, window, interval, output_dir, records_config, key_columns, max_keys,
+             sftp_config=None, folder='Shared Reports', report_name='Call Log'):
+    os.makedirs(output_dir, exist_ok=True)
+    upload_dir = None
+    if sftp_config:
+        upload_dir = os.path.join(output_dir, 'pending_upload')
+        os.makedirs(upload_dir, exist_ok=True)
+    index = RecentKeyIndex(max_keys)
+    writer = TailWriter(output_dir, report_name, records_config['format'], key_columns, index, upload_dir)
+    seeded = writer.seed_from_output()
+
+    print("\n=== Five9 Call Log Tail ===")
+    print(f"Report: {report_name} ({folder})")
+    print(f"Window: last {window} seconds, polling every {interval} seconds")
+    print(f"Output directory: {output_dir}")
+    print(f"Key columns: {', '.join(key_columns)}")
+    if seeded:
+        print(f"Loaded {seeded} keys from today's output")
+    if sftp_config:
+        print(f"SFTP upload enabled: {sftp_config['host']}:{sftp_config['port']}")
+
+    try:
+        while True:
+            poll_started = time.time()
+            timestamp = datetime.datetime.now().strftime('%H:%M:%S')
+            try:
+                row_count, new_rows, start, end = poll_once(
+                    credentials, writer, records_config, folder, report_name, window
+                )
+                print(f"[{timestamp}] {start} to {end}: {row_count} rows, {new_rows} new "
+                      f"({time.time() - poll_started:.1f} seconds, {len(index)} keys tracked)")
+                if row_count > index.max_keys:
+                    print(f"[{timestamp}] ! Window returned more rows than --max-keys ({index.max_keys}); "
+                          "older rows may be appended again")
+            except Exception as e:
+                print(f"[{timestamp}] ✗ Poll failed - {str(e)}")
+            # Rows written before a failed poll are still uploaded
+            if upload_dir:
+                upload_pending(upload_dir, sftp_config)
+
+            time.sleep(max(0, interval - (time.time() - poll_started)))
+    except KeyboardInterrupt:
+        print("\nStopping tail")
+    finally:
+        writer.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Five9 Call Log Tail - keeps pulling a recent window of the Call Log and appends new rows',
+        epilog='''
+Credentials are read from FIVE9_USERNAME and FIVE9_PASSWORD. When the
+SFTP_* variables are set, each poll's new rows are also written to their own
+file under <output-dir>/pending_upload, uploaded after the poll and deleted
+once they are on the server.
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--window', type=int, default=4200, help='Seconds of Call Log to pull on each poll (default: 4200)')
+    parser.add_argument('--max-call-duration', type=int, default=3600,
+                        help='Longest call expected, in seconds; --window must cover it plus --interval (default: 3600)')
+    parser.add_argument('--interval', type=int, default=120, help='Seconds between polls (default: 120)')
+    parser.add_argument('--output-dir', default='five9_tail', help='Directory for the rolling output (default: five9_tail)')
+    parser.add_argument('--format', choices=sorted(RECORD_WRITERS), default='csv', help='Output format (default: csv)')
+    parser.add_argument('--key-column', action='append', metavar='NAME', help='Column(s) that identify a row (default: CALL ID)')
+    parser.add_argument('--max-keys', type=int, default=100000, help='Recent row keys kept for de-duplication (default: 100000)')
+    parser.add_argument('--column-type', action='append', metavar='NAME=TYPE', help='Convert a column to int, float or str (repeatable)')
+    parser.add_argument('--folder', default='Shared Reports', help='Report folder (default: Shared Reports)')
+    parser.add_argument('--report-name', default='Call Log', help='Report name (default: Call Log)')
+
+    args = parser.parse_args()
+    # Calls are only logged once they end but are stamped with their start
+    # time, so a call that lasts longer than the window minus the polling gap
+    # would never fall inside any poll
+    if args.window < args.max_call_duration + args.interval:
+        parser.error(
+            f"--window ({args.window}) must be at least --max-call-duration + --interval "
+            f"({args.max_call_duration + args.interval}) or long calls are never picked up"
+        )
+
+    try:
+        column_types = parse_column_types(args.column_type)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        credentials = get_credentials_from_env()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        sys.exit(1)
+
+    records_config = {
+        'format': args.format,
+        'batch_size': 5000,
+        'column_types': column_types
+    }
+    run_tail(
+        credentials,
+        args.window,
+        args.interval,
+        args.output_dir,
+        records_config,
+        args.key_column or ['CALL ID'],
+        args.max_keys,
+        get_sftp_config_from_env(),
+        args.folder,
+        args.report_name
+    )
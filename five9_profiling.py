@@ -0,0 +1,242 @@
+import os
+import sys
+import time
+import argparse
+import cProfile
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+
+def format_bytes(size):
+    """Format a byte count for the console summaries"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def _reset_peak():
+    # tracemalloc.reset_peak() only exists on Python 3.9+; on older versions
+    # each phase reports the highest peak seen so far instead.
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+
+class NullProfiler:
+    """Stand-in used when --profile is off, so callers never need to branch"""
+
+    def start(self):
+        pass
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def finish(self, output_dir=None):
+        return None
+
+NULL_PROFILER = NullProfiler()
+
+class ReportProfiler:
+    """
+    Track peak memory (tracemalloc) and optionally CPU time (cProfile) for
+    each phase of a single report run.
+    """
+
+    def __init__(self, report_name, top_n=5, use_cprofile=False):
+        self.report_name = report_name
+        self.top_n = top_n
+        self.phases = []
+        self._cprofile = cProfile.Profile() if use_cprofile else None
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self._cprofile:
+            self._cprofile.enable()
+
+    @contextmanager
+    def phase(self, name):
+        _reset_peak()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        started = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - started
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            self.phases.append({
+                'name': name,
+                'duration': duration,
+                'start_bytes': start_bytes,
+                'end_bytes': current_bytes,
+                'peak_bytes': peak_bytes,
+                'top_allocations': self._top_allocations()
+            })
+
+    def _top_allocations(self):
+        # Snapshot of what is still allocated when the phase ends, which is
+        # what carries over into (and inflates) the next phase
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        sites = []
+        for stat in snapshot.statistics('lineno')[:self.top_n]:
+            frame = stat.traceback[0]
+            sites.append({
+                'site': f"{frame.filename}:{frame.lineno}",
+                'size_bytes': stat.size,
+                'count': stat.count
+            })
+        return sites
+
+    def finish(self, output_dir=None):
+        """Stop profiling and return the record to attach to the run results"""
+        cprofile_path = None
+        if self._cprofile:
+            self._cprofile.disable()
+            if output_dir:
+                clean_name = ''.join(c if c.isalnum() else '_' for c in self.report_name.lower())
+                cprofile_path = os.path.join(output_dir, f"{clean_name}.prof")
+                self._cprofile.dump_stats(cprofile_path)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        return {
+            'peak_bytes': max((p['peak_bytes'] for p in self.phases), default=0),
+            'phases': self.phases,
+            'cprofile': cprofile_path
+        }
+
+def print_profile(record):
+    """Print a profile record in the same layout as the detailed results"""
+    print(f"Peak memory: {format_bytes(record['peak_bytes'])}")
+    for phase in record['phases']:
+        print(f"  {phase['name']}: peak {format_bytes(phase['peak_bytes'])}, "
+              f"retained {format_bytes(phase['end_bytes'] - phase['start_bytes'])}, "
+              f"{phase['duration']:.2f} seconds")
+        for site in phase['top_allocations']:
+            print(f"    {format_bytes(site['size_bytes'])} in {site['count']} blocks at {site['site']}")
+    if record['cprofile']:
+        print(f"CPU profile: {record['cprofile']}")
+
+SYNTHETIC_HEADER = ['CALL ID', 'TIMESTAMP', 'CAMPAIGN', 'CALL TYPE', 'AGENT', 'ANI', 'DNIS', 'DISPOSITION', 'CALL TIME']
+
+def _synthetic_rows(size_mb):
+    """Yield Call Log-shaped rows until their CSV form reaches size_mb"""
+    target = size_mb * 1024 * 1024
+    written = 0
+    index = 0
+    while written < target:
+        row = [
+            str(1000000 + index), f"Mon, 6 Jan 2025 09:15:{index % 60:02d}", 'Inbound Sales', 'Inbound',
+            f"agent{index % 50}@example.com", '5551234567', '8005550100', 'Sale', '00:03:27'
+        ]
+        written += sum(len(cell) for cell in row) + len(row)
+        index += 1
+        yield row
+
+def _synthetic_envelope(operation, body):
+    return (
+        '<env:Envelope xmlns:env="http://schemas.xmlsoap.org/soap/envelope/">'
+        '<env:Header/><env:Body>'
+        f'<ns2:{operation}Response xmlns:ns2="http://service.admin.ws.five9.com/">'
+        f'<return>{body}</return>'
+        f'</ns2:{operation}Response>'
+        '</env:Body></env:Envelope>'
+    ).encode('utf-8')
+
+def build_synthetic_response(size_mb):
+    """
+    Build a getReportResultCsv SOAP response carrying roughly size_mb of
+    Call Log-shaped CSV, as bytes off the wire
+    """
+    lines = [','.join(SYNTHETIC_HEADER)]
+    lines.extend(','.join(row) for row in _synthetic_rows(size_mb))
+    csv_text = '\n'.join(lines).replace('&', '&amp;').replace('<', '&lt;')
+    return _synthetic_envelope('getReportResultCsv', csv_text)
+
+def build_synthetic_records_response(size_mb):
+    """
+    Build a getReportResult SOAP response with the same rows as
+    build_synthetic_response, as header and records elements
+    """
+    def values(row):
+        return '<values>' + ''.join(f'<data>{cell}</data>' for cell in row) + '</values>'
+
+    parts = [f'<header>{values(SYNTHETIC_HEADER)}</header>']
+    parts.extend(f'<records>{values(row)}</records>' for row in _synthetic_rows(size_mb))
+    return _synthetic_envelope('getReportResult', ''.join(parts))
+
+def profile_synthetic_report(size_mb, use_cprofile=False, records=False):
+    """
+    Push a synthetic response through the same fetch/extract/write (or
+    records) steps as run_single_report, without the network
+    """
+    from five9_soap_codec import decode_return
+    from five9_report_records import ReportResultParser, CsvRecordWriter
+
+    # The wire buffer stands in for the socket and is built before tracing;
+    # every copy taken from it below counts toward the peak
+    if records:
+        wire = bytearray(build_synthetic_records_response(size_mb))
+    else:
+        wire = bytearray(build_synthetic_response(size_mb))
+    profiler = ReportProfiler(f"synthetic {size_mb}MB", use_cprofile=use_cprofile)
+    profiler.start()
+    with tempfile.TemporaryDirectory() as output_dir:
+        filepath = os.path.join(output_dir, 'synthetic.csv')
+        if records:
+            with profiler.phase('records'):
+                parser = ReportResultParser()
+                chunk_size = 1024 * 1024
+                with open(filepath, 'w', newline='') as f:
+                    writer = CsvRecordWriter(f)
+                    for offset in range(0, len(wire), chunk_size):
+                        for batch in parser.feed(bytes(wire[offset:offset + chunk_size])):
+                            writer.write_batch(batch)
+                    for batch in parser.close():
+                        writer.write_batch(batch)
+                del parser, writer
+        else:
+            with profiler.phase('fetch'):
+                content = bytes(wire)
+            with profiler.phase('extract'):
+                results = decode_return(200, content, 'get report results')
+            del content
+            with profiler.phase('write'):
+                with open(filepath, 'w') as f:
+                    f.write(results)
+            del results
+    return profiler.finish(os.getcwd() if use_cprofile else None)
+
+def check_memory_budget(size_mb, budget_mb, use_cprofile=False, records=False):
+    """Return (within_budget, record) for a synthetic size_mb report"""
+    record = profile_synthetic_report(size_mb, use_cprofile, records)
+    return record['peak_bytes'] <= budget_mb * 1024 * 1024, record
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Five9 report memory budget check - fails when a synthetic report exceeds the peak memory budget'
+    )
+    parser.add_argument('--size-mb', type=int, default=50, help='Size of the synthetic CSV payload in MB (default: 50)')
+    parser.add_argument('--budget-mb', type=float, help='Peak memory budget in MB (default: 3.5x the payload size)')
+    parser.add_argument('--cprofile', action='store_true', help='Also collect a cProfile CPU profile')
+    parser.add_argument('--records', action='store_true', help='Check the structured getReportResult path instead of the CSV blob')
+
+    args = parser.parse_args()
+    budget_mb = args.budget_mb if args.budget_mb is not None else args.size_mb * 3.5
+
+    mode = 'records' if args.records else 'CSV'
+    print(f"\n=== Memory Budget Check: {args.size_mb} MB {mode} report, budget {budget_mb:.1f} MB ===")
+    within_budget, record = check_memory_budget(args.size_mb, budget_mb, args.cprofile, args.records)
+    print_profile(record)
+
+    if within_budget:
+        print(f"✓ Within budget ({format_bytes(record['peak_bytes'])} <= {budget_mb:.1f} MB)")
+    else:
+        print(f"✗ Over budget ({format_bytes(record['peak_bytes'])} > {budget_mb:.1f} MB)")
+        sys.exit(1)
@@ -0,0 +1,269 @@
+import sys
+import json
+import time
+import datetime
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+from five9_reports_api_envvar import (
+    get_credentials_from_env,
+    get_date_ranges,
+    run_report,
+    check_report_status,
+    get_report_results,
+    HTTP_TIMEOUT
+)
+from five9_call_log_tail import format_five9_time
+
+DATE_RANGES = ('today', 'this_week', 'last_week')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def parse_five9_time(value):
+    """
+    Validate an ISO 8601 start/end with a UTC offset and return it in Five9's
+    format, so equivalent spellings share one cache entry and Five9 run
+    """
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}', expected ISO 8601 such as 2025-01-06T00:00:00-05:00")
+    if moment.tzinfo is None:
+        raise ValueError(f"Time '{value}' needs a UTC offset such as -05:00")
+    return format_five9_time(moment)
+
+class GatewayTimeout(Exception):
+    """A coalesced request gave up waiting on another client's Five9 run"""
+
+class _Flight:
+    """One in-progress Five9 job that any number of requests can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class ReportGateway:
+    """
+    Serve Five9 report results to many local clients while running as few
+    Five9 jobs as possible.
+
+    Identical requests that arrive while a job is running wait on that job
+    instead of starting their own (single-flight), and finished results are
+    served from memory until they are ttl seconds old. The cache holds at
+    most max_cache_bytes of results; the oldest entries are dropped first
+    and a result larger than the whole cap is served but not cached.
+    """
+
+    def __init__(self, credentials, ttl=300, timeout=300, poll_interval=5, max_cache_bytes=256 * 1024 * 1024):
+        self.credentials = credentials
+        self.ttl = ttl
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # Longest a leader can take: the polling timeout plus one bounded
+        # HTTP call each for runReport, the last status check and the results
+        self.wait_timeout = timeout + poll_interval + 3 * sum(HTTP_TIMEOUT)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.max_cache_bytes = max_cache_bytes
+        # Insertion order is age order, so eviction pops from the front
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self.stats = {'five9_runs': 0, 'cache_hits': 0, 'coalesced': 0, 'failures': 0, 'evictions': 0}
+
+    def get_report(self, folder, report_name, start, end):
+        """Return (csv_bytes, source) where source is 'hit', 'miss' or 'coalesced'"""
+        key = (folder, report_name, start, end)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.time():
+                self.stats['cache_hits'] += 1
+                return cached[1], 'hit'
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.stats['five9_runs'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if leader:
+            try:
+                flight.result = self._run_five9_report(*key)
+            except Exception as e:
+                flight.error = str(e)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                    if flight.error is None:
+                        self._store(key, flight.result)
+                    else:
+                        self.stats['failures'] += 1
+                flight.done.set()
+        elif not flight.done.wait(self.wait_timeout):
+            raise GatewayTimeout(
+                f"Timed out after {self.wait_timeout} seconds waiting for {report_name} to finish"
+            )
+
+        if flight.error is not None:
+            raise Exception(flight.error)
+        return flight.result, 'miss' if leader else 'coalesced'
+
+    def cache_usage(self):
+        """Return (entries, bytes) currently held in the cache"""
+        with self._lock:
+            return len(self._cache), self._cache_bytes
+
+    def _store(self, key, result):
+        # Called with the lock held
+        self._drop(key)
+        self._prune_cache()
+        if len(result) > self.max_cache_bytes:
+            return
+        while self._cache and self._cache_bytes + len(result) > self.max_cache_bytes:
+            self._drop(next(iter(self._cache)))
+            self.stats['evictions'] += 1
+        self._cache[key] = (time.time() + self.ttl, result)
+        self._cache_bytes += len(result)
+
+    def _drop(self, key):
+        cached = self._cache.pop(key, None)
+        if cached:
+            self._cache_bytes -= len(cached[1])
+
+    def _prune_cache(self):
+        # Entries share one ttl, so the expired ones are all at the front
+        now = time.time()
+        while self._cache and next(iter(self._cache.values()))[0] <= now:
+            self._drop(next(iter(self._cache)))
+
+    def _run_five9_report(self, folder, report_name, start, end):
+        print(f"  Running {report_name} ({folder}) {start} to {end}...")
+        started = time.time()
+        identifier = run_report(self.credentials, folder, report_name, start, end)
+        print(f"  Got report identifier: {identifier}")
+
+        deadline = time.time() + self.timeout
+        while check_report_status(self.credentials, identifier):
+            if time.time() + self.poll_interval > deadline:
+                raise Exception(f"Report timed out after {self.timeout} seconds")
+            time.sleep(self.poll_interval)
+
+        results = get_report_results(self.credentials, identifier) or ''
+        print(f"  ✓ {report_name} completed in {time.time() - started:.1f} seconds")
+        # Only the encoded copy is kept; the text is released on return
+        return results.encode('utf-8')
+
+class GatewayRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /report?folder=...&name=...&range=last_week  (or &start=...&end=...)
+    GET /status
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/status':
+            gateway = self.server.gateway
+            entries, size = gateway.cache_usage()
+            self._send_json(200, dict(gateway.stats, cache_entries=entries, cache_bytes=size))
+        elif url.path == '/report':
+            self._handle_report(parse_qs(url.query))
+        else:
+            self._send_json(404, {'error': f"Unknown path {url.path}"})
+
+    def _handle_report(self, params):
+        folder = params.get('folder', ['Shared Reports'])[0]
+        report_name = params.get('name', ['Call Log'])[0]
+
+        if 'start' in params and 'end' in params:
+            try:
+                start, end = parse_five9_time(params['start'][0]), parse_five9_time(params['end'][0])
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+        else:
+            date_range = params.get('range', ['last_week'])[0]
+            if date_range not in DATE_RANGES:
+                self._send_json(400, {'error': f"range must be one of {', '.join(DATE_RANGES)}"})
+                return
+            dates = get_date_ranges()
+            start, end = dates[f"{date_range}_start"], dates[f"{date_range}_end"]
+
+        try:
+            results, source = self.server.gateway.get_report(folder, report_name, start, end)
+        except GatewayTimeout as e:
+            self._send_json(504, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_json(502, {'error': str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Length', str(len(results)))
+        self.send_header('X-Five9-Gateway', source)
+        self.end_headers()
+        view = memoryview(results)
+        for offset in range(0, len(view), STREAM_CHUNK_SIZE):
+            self.wfile.write(view[offset:offset + STREAM_CHUNK_SIZE])
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        print(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {self.address_string()} {format % args}")
+
+class GatewayServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, gateway):
+        super().__init__(address, GatewayRequestHandler)
+        self.gateway = gateway
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Five9 Report Gateway - shares Five9 report runs between local clients',
+        epilog='''
+Credentials are read from FIVE9_USERNAME and FIVE9_PASSWORD.
+
+Examples:
+  curl "http://127.0.0.1:8099/report?name=Call%20Log&range=last_week"
+  curl "http://127.0.0.1:8099/status"
+        ''',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8099, help='Port to listen on (default: 8099)')
+    parser.add_argument('--ttl', type=int, default=300, help='Seconds to serve cached results (default: 300)')
+    parser.add_argument('--timeout', type=int, default=300, help='Report timeout in seconds (default: 300)')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Most cached results to hold in memory, in MB (default: 256)')
+
+    args = parser.parse_args()
+
+    try:
+        credentials = get_credentials_from_env()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        sys.exit(1)
+
+    gateway = ReportGateway(credentials, ttl=args.ttl, timeout=args.timeout,
+                            max_cache_bytes=args.cache_mb * 1024 * 1024)
+    server = GatewayServer((args.host, args.port), gateway)
+    print("\n=== Five9 Report Gateway ===")
+    print(f"Listening on: http://{args.host}:{args.port}")
+    print(f"Cache TTL: {args.ttl} seconds, up to {args.cache_mb} MB")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+        server.server_close()
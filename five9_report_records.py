@@ -0,0 +1,189 @@
+import csv
+import json
+from xml.parsers import expat
+
+COLUMN_TYPES = {
+    'str': str,
+    'int': int,
+    'float': float
+}
+
+# Distinct values remembered per column so repeated strings (campaigns,
+# dispositions, agents) share one object across a batch
+VALUE_CACHE_LIMIT = 4096
+
+def parse_column_types(specs):
+    """
+    Turn ["CALL ID=int", "COST=float"] into {'CALL ID': int, 'COST': float}
+    """
+    column_types = {}
+    for spec in specs or []:
+        name, sep, type_name = spec.rpartition('=')
+        if not sep or not name or type_name not in COLUMN_TYPES:
+            raise ValueError(
+                f"Invalid column type '{spec}', expected NAME=TYPE with TYPE one of {', '.join(COLUMN_TYPES)}"
+            )
+        column_types[name] = COLUMN_TYPES[type_name]
+    return column_types
+
+class RecordBatch:
+    """A block of report rows stored column by column"""
+
+    __slots__ = ('header', 'columns')
+
+    def __init__(self, header, columns):
+        self.header = header
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def rows(self):
+        return zip(*self.columns)
+
+class ReportResultParser:
+    """
+    Incremental parser for the getReportResult response.
+
+    Five9 returns the report as a header row followed by one <records>
+    element per row, each holding <data> cells. Chunks of the response are
+    fed in as they arrive and completed rows come back as RecordBatch
+    objects, so the whole response never has to be held in memory. Empty
+    cells become None; other cells are converted with column_types.
+    """
+
+    def __init__(self, batch_size=5000, column_types=None):
+        self.batch_size = batch_size
+        self.column_types = column_types or {}
+        self.header = None
+        self.row_count = 0
+
+        # The header/records/data elements are unqualified, so plain names
+        # can be compared directly without namespace processing
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._parser.CharacterDataHandler = self._character_data
+
+        self._row = None
+        self._cell = None
+        self._converters = None
+        self._value_caches = None
+        self._columns = None
+        self._ready = []
+
+    def feed(self, chunk):
+        """Parse the next chunk of the response and return any completed batches"""
+        self._parser.Parse(chunk, False)
+        return self._take_ready()
+
+    def close(self):
+        """Finish parsing and return the remaining rows"""
+        self._parser.Parse(b'', True)
+        if self._columns and (self._columns[0] or self.row_count == 0):
+            # A report with no rows still yields one empty batch so writers
+            # can emit the header
+            self._flush()
+        return self._take_ready()
+
+    def _take_ready(self):
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _start_element(self, name, attrs):
+        if name == 'data':
+            if self._row is not None:
+                self._cell = []
+        elif name == 'records' or name == 'header':
+            self._row = []
+
+    def _end_element(self, name):
+        if name == 'data':
+            cell = self._cell
+            if cell is not None:
+                self._row.append(''.join(cell) if cell else None)
+                self._cell = None
+        elif name == 'records':
+            self._add_row(self._row)
+            self._row = None
+        elif name == 'header':
+            self._start_header(self._row)
+            self._row = None
+
+    def _character_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _start_header(self, header):
+        self.header = [name or '' for name in header]
+        self._converters = [self.column_types.get(name) for name in self.header]
+        self._value_caches = [{} if converter in (None, str) else None for converter in self._converters]
+        self._columns = [[] for _ in self.header]
+
+    def _add_row(self, row):
+        if self.header is None:
+            raise Exception("Report result has records before its header")
+
+        width = len(self.header)
+        if len(row) < width:
+            row.extend([None] * (width - len(row)))
+
+        for index in range(width):
+            value = row[index]
+            if value is not None:
+                cache = self._value_caches[index]
+                if cache is not None:
+                    if len(cache) < VALUE_CACHE_LIMIT:
+                        value = cache.setdefault(value, value)
+                    else:
+                        value = cache.get(value, value)
+                else:
+                    try:
+                        value = self._converters[index](value)
+                    except ValueError:
+                        raise Exception(
+                            f"Column '{self.header[index]}' value {value!r} is not a valid "
+                            f"{self._converters[index].__name__}"
+                        )
+            self._columns[index].append(value)
+
+        self.row_count += 1
+        if len(self._columns[0]) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        self._ready.append(RecordBatch(self.header, self._columns))
+        self._columns = [[] for _ in self.header]
+
+class CsvRecordWriter:
+    """Write record batches as CSV, header first"""
+
+    extension = 'csv'
+
+    def __init__(self, f, write_header=True):
+        self._writer = csv.writer(f, lineterminator='\n')
+        self._wrote_header = not write_header
+
+    def write_batch(self, batch):
+        if not self._wrote_header:
+            self._writer.writerow(batch.header)
+            self._wrote_header = True
+        self._writer.writerows(batch.rows())
+
+class JsonLinesRecordWriter:
+    """Write record batches as one JSON object per row, keeping typed values"""
+
+    extension = 'jsonl'
+
+    def __init__(self, f, write_header=True):
+        self._f = f
+
+    def write_batch(self, batch):
+        header = batch.header
+        self._f.writelines(json.dumps(dict(zip(header, row))) + '\n' for row in batch.rows())
+
+RECORD_WRITERS = {
+    'csv': CsvRecordWriter,
+    'jsonl': JsonLinesRecordWriter
+}
@@ -0,0 +1,245 @@
+import time
+import base64
+import argparse
+from functools import lru_cache
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+FIVE9_ADMIN_URL = "https://api.five9.com/wsadmin/v13/AdminWebService"
+
+class Five9SoapError(Exception):
+    """A Five9 response that could not be turned into a result"""
+
+class Five9SoapFault(Five9SoapError):
+    """
+    A SOAP fault returned by Five9. fault_type is the name of the detail
+    element (e.g. ReportNotFoundException) when Five9 sends one.
+    """
+
+    def __init__(self, action, code, message, fault_type=None):
+        self.action = action
+        self.code = code
+        self.message = message
+        self.fault_type = fault_type
+        label = f"{fault_type}: " if fault_type else ''
+        super().__init__(f"Failed to {action}: {label}{message} ({code})")
+
+def _compile_template(body):
+    """
+    Build an envelope once as bytes with %s placeholders, so encoding a
+    request is a single bytes interpolation instead of re-rendering the XML
+    """
+    envelope = (
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+        'xmlns:ser="http://service.admin.ws.five9.com/">'
+        '<soapenv:Header/><soapenv:Body>' + body + '</soapenv:Body></soapenv:Envelope>'
+    )
+    return envelope.encode('utf-8')
+
+_RUN_REPORT = _compile_template(
+    '<ser:runReport>'
+    '<folderName>%s</folderName>'
+    '<reportName>%s</reportName>'
+    '<criteria><time><start>%s</start><end>%s</end></time></criteria>'
+    '</ser:runReport>'
+)
+_IS_REPORT_RUNNING = _compile_template(
+    '<ser:isReportRunning><identifier>%s</identifier></ser:isReportRunning>'
+)
+_GET_REPORT_RESULT_CSV = _compile_template(
+    '<ser:getReportResultCsv><identifier>%s</identifier></ser:getReportResultCsv>'
+)
+_GET_REPORT_RESULT = _compile_template(
+    '<ser:getReportResult><identifier>%s</identifier></ser:getReportResult>'
+)
+
+def _escape(value):
+    # Every interpolated value goes through here; the substring checks keep
+    # the common case (nothing to escape) to a single encode
+    if '&' in value or '<' in value or '>' in value:
+        value = escape(value)
+    return value.encode('utf-8')
+
+@lru_cache(maxsize=256)
+def _escaped(value):
+    # Folder, report name and date range repeat across every report in a
+    # run, so their escaped bytes are cached
+    return _escape(value)
+
+def encode_run_report(folder, report_name, start_time, end_time):
+    return _RUN_REPORT % (_escaped(folder), _escaped(report_name), _escaped(start_time), _escaped(end_time))
+
+@lru_cache(maxsize=64)
+def encode_is_report_running(identifier):
+    # Polling resends the same identifier until the report finishes
+    return _IS_REPORT_RUNNING % _escape(identifier)
+
+def encode_get_report_result_csv(identifier):
+    return _GET_REPORT_RESULT_CSV % _escape(identifier)
+
+def encode_get_report_result(identifier):
+    return _GET_REPORT_RESULT % _escape(identifier)
+
+@lru_cache(maxsize=16)
+def request_headers(credentials):
+    """HTTP headers for a Five9 SOAP call, built once per set of credentials"""
+    return {
+        'Content-Type': 'text/xml',
+        'Authorization': f'Basic {base64.b64encode(credentials.encode()).decode()}'
+    }
+
+_CAPTURED = ('return', 'faultcode', 'faultstring')
+
+def _extract(content):
+    """
+    Stream the response through expat, keeping only the text of <return> and
+    any fault fields instead of building the whole document tree
+    """
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.buffer_text = True
+    parser.buffer_size = 1024 * 1024
+
+    found = {}
+    state = {'capture': None, 'parts': None, 'in_detail': False, 'fault_type': None}
+
+    def start_element(name, attrs):
+        local = name.rpartition(' ')[2]
+        if state['in_detail'] and state['fault_type'] is None:
+            state['fault_type'] = local
+        elif local == 'detail':
+            state['in_detail'] = True
+        elif local in _CAPTURED and state['capture'] is None:
+            state['capture'] = local
+            state['parts'] = []
+
+    def end_element(name):
+        local = name.rpartition(' ')[2]
+        if local == state['capture']:
+            found.setdefault(local, ''.join(state['parts']))
+            state['capture'] = None
+            state['parts'] = None
+        elif local == 'detail':
+            state['in_detail'] = False
+
+    def character_data(data):
+        if state['parts'] is not None:
+            state['parts'].append(data)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    parser.Parse(content, True)
+
+    return found, state['fault_type']
+
+def decode_return(status_code, content, action):
+    """
+    Return the text of the <return> element from a Five9 SOAP response.
+
+    Raises Five9SoapFault for SOAP faults and Five9SoapError for any other
+    response that does not carry a result.
+    """
+    try:
+        found, fault_type = _extract(content)
+    except expat.ExpatError:
+        if status_code != 200:
+            raise Five9SoapError(f"Failed to {action}: {content.decode('utf-8', 'replace')}")
+        raise Five9SoapError(f"Failed to {action}: response is not valid XML")
+
+    if 'faultstring' in found or 'faultcode' in found:
+        raise Five9SoapFault(action, found.get('faultcode'), found.get('faultstring'), fault_type)
+    if status_code != 200:
+        raise Five9SoapError(f"Failed to {action}: {content.decode('utf-8', 'replace')}")
+    if 'return' not in found:
+        raise Five9SoapError(f"Failed to {action}: response has no return value")
+    return found['return']
+
+def _legacy_encode_run_report(folder, report_name, start_time, end_time):
+    # The f-string envelopes the runners used before this module, kept for the benchmark
+    return f'''
+    <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ser="http://service.admin.ws.five9.com/">
+       <soapenv:Header/>
+       <soapenv:Body>
+          <ser:runReport>
+             <folderName>{folder}</folderName>
+             <reportName>{report_name}</reportName>
+             <criteria>
+                <time>
+                   <start>{start_time}</start>
+                   <end>{end_time}</end>
+                </time>
+             </criteria>
+          </ser:runReport>
+       </soapenv:Body>
+    </soapenv:Envelope>
+    '''
+
+def _legacy_encode_is_report_running(identifier):
+    return f'''
+    <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ser="http://service.admin.ws.five9.com/">
+       <soapenv:Header/>
+       <soapenv:Body>
+          <ser:isReportRunning>
+             <identifier>{identifier}</identifier>
+          </ser:isReportRunning>
+       </soapenv:Body>
+    </soapenv:Envelope>
+    '''
+
+def _legacy_decode_return(content):
+    import xml.etree.ElementTree as ET
+    root = ET.fromstring(content.decode('utf-8'))
+    return root.find('.//return').text
+
+def _time_per_call(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations
+
+def run_benchmark(iterations=20000, size_mb=5):
+    """Print per-call encode/decode cost for the old f-string/ElementTree path and this codec"""
+    from five9_profiling import build_synthetic_response
+
+    args = ('Shared Reports', 'Call Log', '2025-01-01T00:00:00.000-05:00', '2025-01-07T23:59:59.000-05:00')
+    credentials = 'user@example.com:password'
+    identifier = '3f9c2a6e-1b7d-4c11-9e0a-5d2f8b7c4a10'
+    status_response = (
+        b'<env:Envelope xmlns:env="http://schemas.xmlsoap.org/soap/envelope/"><env:Body>'
+        b'<ns2:isReportRunningResponse xmlns:ns2="http://service.admin.ws.five9.com/">'
+        b'<return>false</return></ns2:isReportRunningResponse></env:Body></env:Envelope>'
+    )
+    csv_response = build_synthetic_response(size_mb)
+    large_iterations = max(1, iterations // 2000)
+
+    cases = [
+        ('encode runReport + headers', iterations,
+         lambda: (_legacy_encode_run_report(*args).encode('utf-8'),
+                  {'Content-Type': 'text/xml',
+                   'Authorization': f'Basic {base64.b64encode(credentials.encode()).decode()}'}),
+         lambda: (encode_run_report(*args), request_headers(credentials))),
+        ('encode isReportRunning', iterations,
+         lambda: _legacy_encode_is_report_running(identifier).encode('utf-8'),
+         lambda: encode_is_report_running(identifier)),
+        ('decode isReportRunning', iterations,
+         lambda: _legacy_decode_return(status_response),
+         lambda: decode_return(200, status_response, 'check report status')),
+        (f'decode {size_mb} MB CSV result', large_iterations,
+         lambda: _legacy_decode_return(csv_response),
+         lambda: decode_return(200, csv_response, 'get report results')),
+    ]
+
+    print("\n=== SOAP Codec Benchmark ===")
+    for name, count, before, after in cases:
+        before_cost = _time_per_call(before, count)
+        after_cost = _time_per_call(after, count)
+        print(f"{name}: {before_cost * 1e6:.1f} us -> {after_cost * 1e6:.1f} us "
+              f"({before_cost / after_cost:.1f}x, {count} calls)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Five9 SOAP codec benchmark')
+    parser.add_argument('--iterations', type=int, default=20000, help='Calls per small-message case (default: 20000)')
+    parser.add_argument('--size-mb', type=int, default=5, help='Size of the synthetic CSV result in MB (default: 5)')
+
+    args = parser.parse_args()
+    run_benchmark(args.iterations, args.size_mb)